@@ -1,13 +1,69 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import json
+import logging
+import time
 
-DATABASE_URL = "sqlite:///./students.db"
+import orjson
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+DATABASE_URL = "sqlite+aiosqlite:///./students.db"
+
+# Log statements slower than this (seconds) to surface N+1s / missing indexes
+SLOW_QUERY_SECONDS = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+# orjson never emits leading whitespace, so this (still valid JSON) prefix tags the
+# rare rows written by the stdlib fallback; reads check one character, not the text
+_STDLIB_TAG = " "
+
+
+def _json_serializer(value) -> str:
+    # orjson for JSON columns; stdlib fallback for what orjson rejects (e.g. ints > 64 bits)
+    try:
+        return orjson.dumps(value).decode()
+    except TypeError:
+        return _STDLIB_TAG + json.dumps(value)
+
+
+def _json_deserializer(text: str):
+    # Tagged rows may hold ints orjson would parse as lossy floats; stdlib keeps them exact
+    if text.startswith(_STDLIB_TAG):
+        return json.loads(text)
+    return orjson.loads(text)
+
+
+# aiosqlite defaults to NullPool (new connection + thread per checkout); pool explicitly
+engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    json_serializer=_json_serializer,
+    json_deserializer=_json_deserializer,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    if elapsed > SLOW_QUERY_SECONDS:
+        logger.warning("slow query (%.3fs): %s", elapsed, statement)
+
+
+# expire_on_commit=False: attribute access after commit must not trigger implicit (sync) IO
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass
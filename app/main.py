@@ -1,16 +1,21 @@
 from __future__ import annotations
 from datetime import datetime, timezone
-from typing import Generator
+from typing import Any, AsyncGenerator
 
+import json
 import os
 import logging
-from fastapi import FastAPI, Depends, HTTPException, Request
-from fastapi.responses import RedirectResponse, FileResponse
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import RedirectResponse, FileResponse, ORJSONResponse, Response
+from sqlalchemy import Select, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.middleware.sessions import SessionMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from starlette.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from authlib.integrations.starlette_client import OAuth
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -26,21 +31,83 @@ from .schemas import (
     SubmissionOut,
     SubmissionWithUserOut,
 )
-from .utils import generate_student_id, generate_edit_token
+from .utils import TTLCache, generate_student_id, generate_edit_token
 
 # ---- Helpers ----
-def iso_utc(dt: datetime | None) -> str:
-    if not dt:
-        return ""
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    else:
-        dt = dt.astimezone(timezone.utc)
-    return dt.isoformat()
+def provided_name(payload: Any) -> str | None:
+    """Name the student typed into the form (payload.identity.name), if any."""
+    try:
+        if isinstance(payload, dict):
+            ident = (payload.get("identity") or {})
+            return (ident.get("name") or "").strip() or None
+    except Exception:
+        pass
+    return None
+
+
+class UTCJSONResponse(ORJSONResponse):
+    """orjson response that renders naive (UTC) datetimes natively as ISO-8601 with `Z`."""
+
+    def render(self, content: Any) -> bytes:
+        try:
+            return orjson.dumps(
+                content,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z,
+            )
+        except TypeError:
+            # orjson rejects ints wider than 64 bits; stdlib keeps them exact
+            return json.dumps(
+                content, default=_json_default, ensure_ascii=False, separators=(",", ":")
+            ).encode()
+
+
+def _json_default(value: Any) -> Any:
+    # Same datetime rendering as orjson's OPT_NAIVE_UTC | OPT_UTC_Z
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return jsonable_encoder(value)
+
+
+# ---- Keyset pagination for submission lists ----
+PAGE_SIZE = 50
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+CURSOR_QUERY = Query(
+    default=None,
+    description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header; omit for the first page",
+)
+
+
+def encode_cursor(created_at: datetime, subm_id: str) -> str:
+    return f"{created_at.isoformat()}_{subm_id}"
+
+
+def paginate(stmt: Select, cursor: str | None) -> Select:
+    """Order newest-first on (created_at, id) and seek past `cursor` (no OFFSET)."""
+    if cursor:
+        ts, _, subm_id = cursor.partition("_")
+        try:
+            created_at = datetime.fromisoformat(ts)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+        if not subm_id:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+        stmt = stmt.where(tuple_(Submission.created_at, Submission.id) < (created_at, subm_id))
+    return stmt.order_by(Submission.created_at.desc(), Submission.id.desc()).limit(PAGE_SIZE)
+
+
+def page_response(items: list[dict[str, Any]], last_row: Any) -> UTCJSONResponse:
+    # Body stays a plain list; the next-page cursor travels in a header
+    resp = UTCJSONResponse(items)
+    if len(items) == PAGE_SIZE:
+        resp.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_row.created_at, last_row.id)
+    return resp
 
 load_dotenv()
 
-app = FastAPI(title="Students API", version="1.0.0")
+app = FastAPI(title="Students API", version="1.0.0", default_response_class=UTCJSONResponse)
 
 # --- Session & security config (SessionMiddleware added later) ---
 SESSION_SECRET = os.getenv("SESSION_SECRET") or os.getenv("SECRET_KEY") or "dev-secret-change-me"
@@ -55,21 +122,38 @@ except Exception:
     # In some environments the directory may not exist; ignore mounting failure
     pass
 
-# --- Middleware: Guard /student paths behind login ---
-class StudentGuardMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Authentication disabled: always allow access
-        return await call_next(request)
+# Only routes that read/write request.session pay for cookie parsing + HMAC
+SESSION_PATH_PREFIXES = ("/auth", "/me")
+
+
+class PathSessionMiddleware:
+    """Apply SessionMiddleware only to requests under `path_prefixes`."""
+
+    def __init__(self, app: ASGIApp, path_prefixes: tuple[str, ...], **session_kwargs: Any) -> None:
+        self.app = app
+        self.session_app = SessionMiddleware(app, **session_kwargs)
+        self.exact = frozenset(path_prefixes)
+        self.prefixes = tuple(p.rstrip("/") + "/" for p in path_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            if path in self.exact or path.startswith(self.prefixes):
+                return await self.session_app(scope, receive, send)
+        await self.app(scope, receive, send)
+
 
-# Add guard first, then add SessionMiddleware so Session runs first (outermost)
-app.add_middleware(StudentGuardMiddleware)
 app.add_middleware(
-    SessionMiddleware,
+    PathSessionMiddleware,
+    path_prefixes=SESSION_PATH_PREFIXES,
     secret_key=SESSION_SECRET,
     https_only=SESSION_COOKIE_SECURE,
     same_site=SESSION_SAMESITE,
 )
 
+# Compress JSON list responses (added after Session so it wraps it)
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+
 # Optional: CORS for allowed origins (comma-separated)
 ALLOW_ORIGINS = [o.strip() for o in os.getenv("ALLOW_ORIGINS", "").split(",") if o.strip()]
 if ALLOW_ORIGINS:
@@ -79,18 +163,41 @@ if ALLOW_ORIGINS:
         allow_credentials=True,
         allow_methods=["POST", "GET", "OPTIONS"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
-# Security headers
-@app.middleware("http")
-async def security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers.setdefault("X-Frame-Options", "DENY")
-    response.headers.setdefault("X-Content-Type-Options", "nosniff")
-    response.headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
+# Security headers, pre-encoded once as raw ASGI header tuples
+SECURITY_HEADERS: list[tuple[bytes, bytes]] = [
+    (b"x-frame-options", b"DENY"),
+    (b"x-content-type-options", b"nosniff"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
     # Minimal CSP; adjust as needed
-    response.headers.setdefault("Content-Security-Policy", "default-src 'self'; img-src 'self' https: data:; style-src 'self' 'unsafe-inline'; script-src 'self' 'unsafe-inline'")
-    return response
+    (b"content-security-policy", b"default-src 'self'; img-src 'self' https: data:; style-src 'self' 'unsafe-inline'; script-src 'self' 'unsafe-inline'"),
+]
+
+
+# Pure ASGI: no extra task or stream hop per request
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # setdefault semantics: keep any value the endpoint already set
+                headers = list(message.get("headers", ()))
+                present = {k.lower() for k, _ in headers}
+                headers.extend(h for h in SECURITY_HEADERS if h[0] not in present)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+app.add_middleware(SecurityHeadersMiddleware)
 
 # --- OAuth (Google) Configuration ---
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -115,18 +222,61 @@ class UserInfo(BaseModel):
     picture: str | None = None
 
 
+# In-process cache of user profiles keyed by google_sub (cache-aside over `users`)
+user_cache = TTLCache(maxsize=10_000, ttl=300)
+
+
+async def get_user_cached(db: AsyncSession, sub: str | None) -> UserInfo | None:
+    if not sub:
+        return None
+    info = user_cache.get(sub)
+    if info is None:
+        obj = await db.get(User, sub)
+        if obj is None:
+            return None
+        info = UserInfo(sub=obj.google_sub, email=obj.email, name=obj.name, picture=obj.picture)
+        user_cache.set(sub, info)
+    return info
+
+
+# Viewer pages served from memory (loaded at startup; restart to pick up edits)
+HTML_PAGES = ("docs/admin.html", "docs/submission.html")
+html_cache: dict[str, bytes] = {}
+
+
+def html_page(path: str) -> Response:
+    content = html_cache.get(path)
+    if content is None:
+        # Not loaded at startup (e.g. file missing then): fall back to disk
+        return FileResponse(path)
+    return Response(content, media_type="text/html")
+
+
 # Create tables on startup
 @app.on_event("startup")
-def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
+async def on_startup() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(_create_schema)
+    # Small static viewer pages: read once instead of stat + open per request
+    for path in HTML_PAGES:
+        try:
+            with open(path, "rb") as f:
+                html_cache[path] = f.read()
+        except FileNotFoundError:
+            pass
 
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+def _create_schema(conn) -> None:
+    Base.metadata.create_all(bind=conn)
+    # create_all skips indexes on tables that already exist; add any new ones
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def get_current_user(request: Request) -> UserInfo | None:
@@ -143,42 +293,35 @@ def require_login(request: Request) -> UserInfo:
 
 
 @app.get("/")
-def root():
+async def root():
     # Redirect to interactive API docs for convenience
     return RedirectResponse(url="/docs")
 
 # Simple route to access admin viewer
 @app.get("/admin", include_in_schema=False)
-def admin_page():
-    return FileResponse("docs/admin.html")
+async def admin_page():
+    return html_page("docs/admin.html")
 
 
-@app.get("/admin/submissions/{subm_id}", response_model=SubmissionWithUserOut)
-def admin_get_submission(subm_id: str, request: Request, db: Session = Depends(get_db)):
-    subm = db.get(Submission, subm_id)
+@app.get("/admin/submissions/{subm_id}", responses={200: {"model": SubmissionWithUserOut}})
+async def admin_get_submission(subm_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    subm = await db.get(Submission, subm_id)
     if not subm:
         raise HTTPException(status_code=404, detail="not found")
-    usr = db.get(User, subm.google_sub)
-    provided_name = None
-    try:
-        if isinstance(subm.payload, dict):
-            ident = (subm.payload.get("identity") or {})
-            provided_name = (ident.get("name") or "").strip() or None
-    except Exception:
-        provided_name = None
-    return SubmissionWithUserOut(
-        id=subm.id,
-        created_at=iso_utc(subm.created_at),
-        payload=subm.payload,
-        user_sub=(usr.google_sub if usr else subm.google_sub),
-        user_email=(usr.email if usr else None),
-        user_name=((usr.name if usr else None) or provided_name),
-    )
+    usr = await get_user_cached(db, subm.google_sub)
+    return UTCJSONResponse({
+        "id": subm.id,
+        "created_at": subm.created_at,
+        "payload": subm.payload,
+        "user_sub": (usr.sub if usr else subm.google_sub),
+        "user_email": (usr.email if usr else None),
+        "user_name": ((usr.name if usr else None) or provided_name(subm.payload)),
+    })
 
 
 @app.get("/admin/submissions/{subm_id}/view", include_in_schema=False)
-def admin_view_submission(subm_id: str):
-    return FileResponse("docs/submission.html")
+async def admin_view_submission(subm_id: str):
+    return html_page("docs/submission.html")
 
 
 # --- Auth Routes ---
@@ -201,8 +344,31 @@ async def auth_login(request: Request):
     return await oauth.google.authorize_redirect(request, redirect_uri)
 
 
+async def upsert_user(info: UserInfo, now: datetime) -> None:
+    """Insert or refresh the `users` row for a login; runs as a background task."""
+    async with SessionLocal() as db:
+        obj = await db.get(User, info.sub)
+        if obj is None:
+            obj = User(
+                google_sub=info.sub,
+                email=info.email,
+                name=info.name,
+                picture=info.picture,
+                created_at=now,
+                last_login_at=now,
+            )
+            db.add(obj)
+        else:
+            obj.email = info.email
+            obj.name = info.name
+            obj.picture = info.picture
+            obj.last_login_at = now
+            db.add(obj)
+        await db.commit()
+
+
 @app.get("/auth/callback")
-async def auth_callback(request: Request):
+async def auth_callback(request: Request, background_tasks: BackgroundTasks):
     try:
         token = await oauth.google.authorize_access_token(request)
     except Exception as e:
@@ -221,31 +387,10 @@ async def auth_callback(request: Request):
         "picture": userinfo.get("picture"),
     }
 
-    # Upsert user in DB
-    db = SessionLocal()
-    try:
-        sub = request.session["user"]["sub"]
-        obj = db.get(User, sub)
-        now = datetime.utcnow()
-        if obj is None:
-            obj = User(
-                google_sub=sub,
-                email=request.session["user"].get("email"),
-                name=request.session["user"].get("name"),
-                picture=request.session["user"].get("picture"),
-                created_at=now,
-                last_login_at=now,
-            )
-            db.add(obj)
-        else:
-            obj.email = request.session["user"].get("email")
-            obj.name = request.session["user"].get("name")
-            obj.picture = request.session["user"].get("picture")
-            obj.last_login_at = now
-            db.add(obj)
-        db.commit()
-    finally:
-        db.close()
+    # Cache now; upsert user in DB after the redirect has been sent
+    info = UserInfo(**request.session["user"])
+    user_cache.set(info.sub, info)
+    background_tasks.add_task(upsert_user, info, datetime.utcnow())
 
     # Redirect to student page or a provided next param
     next_from_session = request.session.pop("next_after_login", None)
@@ -256,7 +401,9 @@ async def auth_callback(request: Request):
 
 @app.get("/auth/logout")
 async def auth_logout(request: Request):
-    request.session.pop("user", None)
+    user = request.session.pop("user", None)
+    if user and user.get("sub"):
+        user_cache.pop(user["sub"])
     return {"ok": True}
 
 
@@ -269,7 +416,7 @@ async def me(request: Request):
 
 
 @app.post("/students", response_model=StudentCreatedOut)
-def create_student(payload: StudentCreate, db: Session = Depends(get_db)):
+async def create_student(payload: StudentCreate, db: AsyncSession = Depends(get_db)):
     # Create random ID + edit token; do not store PII unless provided explicitly
     now = datetime.utcnow()
     student_id = generate_student_id()
@@ -283,8 +430,8 @@ def create_student(payload: StudentCreate, db: Session = Depends(get_db)):
         updated_at=now,
     )
     db.add(student)
-    db.commit()
-    db.refresh(student)
+    await db.commit()
+    await db.refresh(student)
     return StudentCreatedOut(
         id=student.id,
         name=student.name,
@@ -295,8 +442,8 @@ def create_student(payload: StudentCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/students/{student_id}", response_model=StudentOut)
-def get_student(student_id: str, db: Session = Depends(get_db)):
-    obj = db.get(Student, student_id)
+async def get_student(student_id: str, db: AsyncSession = Depends(get_db)):
+    obj = await db.get(Student, student_id)
     if not obj:
         raise HTTPException(status_code=404, detail="student not found")
     return StudentOut(
@@ -308,63 +455,69 @@ def get_student(student_id: str, db: Session = Depends(get_db)):
 
 
 # --- Submission endpoints (require login) ---
-@app.post("/submissions", response_model=SubmissionOut)
-def create_submission(payload: SubmissionIn, request: Request, db: Session = Depends(get_db)):
+@app.post("/submissions", responses={200: {"model": SubmissionOut}})
+async def create_submission(payload: SubmissionIn, request: Request, db: AsyncSession = Depends(get_db)):
     # Anonymous submissions allowed
     sid = generate_student_id()
     subm = Submission(id=sid, google_sub=None, payload=payload.payload)
     db.add(subm)
-    db.commit()
-    db.refresh(subm)
-    return SubmissionOut(id=subm.id, created_at=iso_utc(subm.created_at), payload=subm.payload)
-
-
-@app.get("/submissions", response_model=list[SubmissionOut])
-def list_submissions(request: Request, db: Session = Depends(get_db)):
-    # Public: show recent submissions (latest 50)
-    rows = (
-        db.query(Submission)
-        .order_by(Submission.created_at.desc())
-        .limit(50)
-        .all()
-    )
-    return [SubmissionOut(id=r.id, created_at=iso_utc(r.created_at), payload=r.payload) for r in rows]
-
-
-# Admin: list all submissions with minimal user info
-@app.get("/admin/submissions", response_model=list[SubmissionWithUserOut])
-def admin_list_submissions(request: Request, db: Session = Depends(get_db)):
-    # Public admin list (no login)
-    q = (
-        db.query(Submission, User)
-        .join(User, Submission.google_sub == User.google_sub, isouter=True)
-        .order_by(Submission.created_at.desc())
-    )
-    out: list[SubmissionWithUserOut] = []
-    for subm, usr in q.all():
-        provided_name = None
-        try:
-            if isinstance(subm.payload, dict):
-                ident = (subm.payload.get("identity") or {})
-                provided_name = (ident.get("name") or "").strip() or None
-        except Exception:
-            provided_name = None
-        out.append(
-            SubmissionWithUserOut(
-                id=subm.id,
-                created_at=iso_utc(subm.created_at),
-                payload=subm.payload,
-                user_sub=(usr.google_sub if usr else subm.google_sub),
-                user_email=(usr.email if usr else None),
-                user_name=(usr.name or provided_name if usr else provided_name),
-            )
+    await db.commit()
+    await db.refresh(subm)
+    return UTCJSONResponse({"id": subm.id, "created_at": subm.created_at, "payload": subm.payload})
+
+
+@app.get("/submissions", responses={200: {"model": list[SubmissionOut]}})
+async def list_submissions(
+    request: Request,
+    cursor: str | None = CURSOR_QUERY,
+    db: AsyncSession = Depends(get_db),
+):
+    # Public: show recent submissions (50 per page); plain column tuples, no ORM objects
+    stmt = paginate(select(Submission.id, Submission.created_at, Submission.payload), cursor)
+    rows = (await db.execute(stmt)).all()
+    # Hot path: hand raw datetimes straight to orjson instead of formatting per row
+    items = [{"id": r.id, "created_at": r.created_at, "payload": r.payload} for r in rows]
+    return page_response(items, rows[-1] if rows else None)
+
+
+# Admin: list recent submissions with minimal user info
+@app.get("/admin/submissions", responses={200: {"model": list[SubmissionWithUserOut]}})
+async def admin_list_submissions(
+    request: Request,
+    cursor: str | None = CURSOR_QUERY,
+    db: AsyncSession = Depends(get_db),
+):
+    # Public admin list (no login): 50 per page as plain column tuples, user columns joined in
+    stmt = paginate(
+        select(
+            Submission.id,
+            Submission.created_at,
+            Submission.payload,
+            Submission.google_sub,
+            User.email,
+            User.name,
         )
-    return out
+        .outerjoin(Submission.user),
+        cursor,
+    )
+    rows = (await db.execute(stmt)).all()
+    out = [
+        {
+            "id": r.id,
+            "created_at": r.created_at,
+            "payload": r.payload,
+            "user_sub": r.google_sub,
+            "user_email": r.email,
+            "user_name": (r.name or provided_name(r.payload)),
+        }
+        for r in rows
+    ]
+    return page_response(out, rows[-1] if rows else None)
 
 
 @app.put("/students/{student_id}", response_model=StudentOut)
-def update_student(student_id: str, payload: StudentUpdate, db: Session = Depends(get_db)):
-    obj = db.get(Student, student_id)
+async def update_student(student_id: str, payload: StudentUpdate, db: AsyncSession = Depends(get_db)):
+    obj = await db.get(Student, student_id)
     if not obj:
         raise HTTPException(status_code=404, detail="student not found")
 
@@ -381,17 +534,21 @@ def update_student(student_id: str, payload: StudentUpdate, db: Session = Depend
         "version": obj.version,
         "updated_at": obj.updated_at.isoformat() if obj.updated_at else None,
     }
-    hist = StudentHistory(student_id=obj.id, version=obj.version, snapshot=snapshot)
-    db.add(hist)
+    now = datetime.utcnow()
+    # History rows are never read back here: plain bulk INSERT, no ORM object/identity map
+    await db.execute(
+        insert(StudentHistory),
+        [{"student_id": obj.id, "version": obj.version, "snapshot": snapshot, "changed_at": now}],
+    )
 
     # Apply updates
     if payload.name is not None:
         obj.name = payload.name
     obj.version = (obj.version or 1) + 1
-    obj.updated_at = datetime.utcnow()
+    obj.updated_at = now
     db.add(obj)
-    db.commit()
-    db.refresh(obj)
+    await db.commit()
+    # No refresh: every attribute returned below was just set locally
     return StudentOut(
         id=obj.id,
         name=obj.name,
@@ -2,7 +2,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -62,3 +62,11 @@ class Submission(Base):
     google_sub: Mapped[Optional[str]] = mapped_column(String(64), ForeignKey("users.google_sub"), index=True, nullable=True)
     payload: Mapped[dict] = mapped_column(JSON, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Must be eager-loaded explicitly; accidental lazy loads (N+1) raise
+    user: Mapped[Optional[User]] = relationship(lazy="raise")
+
+    # Serves the "ORDER BY created_at DESC LIMIT n" list queries (id breaks ties)
+    __table_args__ = (
+        Index("ix_submissions_created_at_desc_id", created_at.desc(), id.desc()),
+    )
@@ -1,12 +1,47 @@
 import secrets
-import uuid
+import threading
+import time
+from typing import Any, Hashable, Optional
 
 
 def generate_student_id() -> str:
-    """Generate a random, non-guessable ID (UUID v4 hex)."""
-    return uuid.uuid4().hex  # 32 hex chars
+    """Generate a random, non-guessable ID (128 random bits as hex)."""
+    return secrets.token_hex(16)  # 32 hex chars
 
 
 def generate_edit_token() -> str:
     """Generate a secret edit token to authorize updates."""
     return secrets.token_urlsafe(16)  # ~22 url-safe chars
+
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            # Re-insert so dict order stays oldest-first for eviction
+            self._data.pop(key, None)
+            if len(self._data) >= self.maxsize:
+                del self._data[next(iter(self._data))]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)